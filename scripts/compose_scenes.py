@@ -8,9 +8,19 @@ into final reel format (9:16, 30-45 seconds).
 import os
 import sys
 import json
+import shutil
 import subprocess
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
+# mutagen reads mp3 duration from frame headers without spawning ffprobe
+try:
+    from mutagen.mp3 import MP3
+except ImportError:
+    MP3 = None
+
 # Directories
 VIDEOS_DIR = Path("outputs/videos")
 AUDIO_DIR = Path("outputs/audio")
@@ -20,25 +30,448 @@ FINAL_DIR = Path("outputs/final")
 COMPOSED_DIR.mkdir(parents=True, exist_ok=True)
 FINAL_DIR.mkdir(parents=True, exist_ok=True)
 
+# 9:16 reel format
+SCALE_FILTER = "scale=1080:1920:force_original_aspect_ratio=decrease,pad=1080:1920:(ow-iw)/2:(oh-ih)/2,setsar=1"
+
+# Per-scene FFmpeg thread budget. Scenes are composed in parallel, so
+# workers x threads should roughly match the available cores.
+FFMPEG_THREADS = max(1, int(os.environ.get("FFMPEG_THREADS", "2")))
+SCENE_GLOBAL_ARGS = ["-filter_threads", "1", "-filter_complex_threads", "1"]
+
+# Composed scenes share identical stream parameters (CFR 30 fps, 1080x1920,
+# H.264 High, fixed GOP, AAC-LC 48 kHz stereo) so they can be concatenated
+# with stream copy instead of a re-encode.
+SCENE_VIDEO_FILTER = SCALE_FILTER + ",fps=30,format=yuv420p"
+SCENE_VIDEO_ARGS = [
+    "-c:v", "libx264", "-preset", "fast", "-profile:v", "high",
+    "-pix_fmt", "yuv420p", "-r", "30",
+    "-g", "60", "-keyint_min", "60", "-sc_threshold", "0",
+    "-threads", str(FFMPEG_THREADS),
+]
+SCENE_AUDIO_ARGS = ["-c:a", "aac", "-b:a", "128k", "-ar", "48000", "-ac", "2"]
+
+# Streaming-friendly final reel written in a single sequential pass:
+# fragmented mp4 instead of +faststart's second pass to move the moov box
+FINAL_MOVFLAGS = [
+    "-movflags", "+frag_keyframe+empty_moov+default_base_moof",
+    "-frag_duration", "1000000",
+]
+
+# Generated clips are meant to be 5-6 s; longer videos are cut on input
+# unless dialogue runs longer. Mis-generated TTS clips are capped too.
+MAX_SCENE_SECONDS = 6.0
+MAX_DIALOGUE_SECONDS = 15.0
+
+# Dialogue layout: silence before the first line and between lines
+DIALOGUE_LEAD = 0.2
+DIALOGUE_GAP = 0.3
+
+# Probe results (duration + stream info) persisted across runs,
+# keyed by (abs_path, mtime_ns, size)
+_DURATION_CACHE_PATH = Path("outputs/.duration_cache.json")
+_duration_cache = None
+_duration_cache_lock = threading.Lock()
+
+
+def _load_duration_cache() -> dict:
+    """Lazily load the duration cache sidecar."""
+    global _duration_cache
+    with _duration_cache_lock:
+        if _duration_cache is None:
+            try:
+                _duration_cache = json.loads(_DURATION_CACHE_PATH.read_text())
+            except (OSError, ValueError):
+                _duration_cache = {}
+    return _duration_cache
+
+
+def _duration_cache_key(file_path: str):
+    """Build cache key from file identity; None if the file can't be stat()ed."""
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        return None
+    return f"{Path(file_path).absolute()}|{st.st_mtime_ns}|{st.st_size}"
+
+
+def save_duration_cache():
+    """Flush the duration cache sidecar to disk."""
+    if _duration_cache is None:
+        return
+    try:
+        with open(_DURATION_CACHE_PATH, 'w') as f:
+            json.dump(_duration_cache, f)
+    except OSError as e:
+        print(f"Warning: could not save duration cache: {e}")
+
+
+# Stream fields used to decide whether videos can be stream-copied/concatenated.
+# extradata_hash covers the codec parameter sets (H.264 SPS/PPS, AAC config):
+# an mp4 keeps only one avcC, so segments with different ones decode corrupted.
+_PROBE_STREAM_ENTRIES = (
+    "codec_type,codec_name,profile,level,refs,has_b_frames,width,height,pix_fmt,"
+    "sample_aspect_ratio,avg_frame_rate,time_base,sample_rate,channels,extradata_hash"
+)
+
+
+def probe_media(paths: list) -> list:
+    """
+    Probe several media files in one batch.
+    Cached files are answered from the sidecar; for the rest, ffprobe
+    only accepts a single input per invocation, so all probes are
+    started up front and collected together instead of one by one.
+    Returns a list aligned to paths of {"duration", "streams"} dicts
+    (None where probing failed).
+    """
+    cache = _load_duration_cache()
+    keys = [_duration_cache_key(p) for p in paths]
+    
+    def cached(key):
+        # Entries from older runs may lack stream fields probed now
+        entry = cache.get(key) if key is not None else None
+        if isinstance(entry, dict) and entry.get("entries") == _PROBE_STREAM_ENTRIES:
+            return entry
+        return None
+    
+    # One probe per distinct file; paths without a key (missing files)
+    # each get their own so the failure is reported per path
+    probe_ids = []
+    procs = {}
+    for idx, file_path in enumerate(paths):
+        key = keys[idx]
+        probe_id = key if key is not None else idx
+        if probe_id not in procs and cached(key):
+            probe_ids.append(None)
+            continue
+        probe_ids.append(probe_id)
+        if probe_id in procs:
+            continue
+        try:
+            # Our inputs are small, well-formed mp4/mp3s whose headers hold
+            # everything we read, so cap the stream-info scan: 32K probesize,
+            # a 0.1 s analyze window (0 would mean ffmpeg's 5 s default),
+            # and read at most one packet
+            procs[probe_id] = subprocess.Popen([
+                "ffprobe", "-v", "error",
+                "-probesize", "32K",
+                "-analyzeduration", "100000",
+                "-read_intervals", "%+#1",
+                "-show_data_hash", "SHA256",
+                "-show_entries", f"format=duration:stream={_PROBE_STREAM_ENTRIES}",
+                "-of", "json",
+                str(file_path)
+            ], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        except OSError:
+            procs[probe_id] = None
+    
+    # Every started probe is waited on, even if its key was cached meanwhile
+    probed = {}
+    for probe_id, proc in procs.items():
+        if proc is None:
+            probed[probe_id] = None
+            continue
+        try:
+            stdout, _ = proc.communicate()
+            data = json.loads(stdout)
+            info = {
+                "duration": float(data["format"]["duration"]),
+                "streams": data.get("streams", []),
+                "entries": _PROBE_STREAM_ENTRIES,
+            }
+        except:
+            probed[probe_id] = None
+            continue
+        if isinstance(probe_id, str):
+            cache[probe_id] = info
+        probed[probe_id] = info
+    
+    results = []
+    for key, probe_id in zip(keys, probe_ids):
+        results.append(cached(key) if probe_id is None else probed[probe_id])
+    
+    return results
+
+
+def get_media_durations(paths: list) -> list:
+    """Get durations of several media files, aligned to paths."""
+    return [
+        info["duration"] if info else 5.0  # Default duration
+        for info in probe_media(paths)
+    ]
+
 
 def get_media_duration(file_path: str) -> float:
     """Get duration of media file using ffprobe."""
+    return get_media_durations([file_path])[0]
+
+
+def _probe_video_stream(file_path: str) -> dict:
+    """First video stream of a file from the (cached) probe, or {}."""
+    info = probe_media([file_path])[0]
+    for stream in (info or {}).get("streams", []):
+        if stream.get("codec_type") == "video":
+            return stream
+    return {}
+
+
+def _is_target_video(file_path: str) -> bool:
+    """Check whether a video already matches the normalized scene format."""
+    stream = _probe_video_stream(file_path)
+    return (
+        stream.get("codec_name") == "h264"
+        and stream.get("profile") == "High"
+        and stream.get("width") == 1080
+        and stream.get("height") == 1920
+        and stream.get("pix_fmt") == "yuv420p"
+        and stream.get("sample_aspect_ratio", "1:1") in ("1:1", "0:1")
+        and stream.get("avg_frame_rate") == "30/1"
+    )
+
+
+def _can_copy_scene_videos(video_paths: list) -> bool:
+    """
+    Decide stream copy for the whole set of scene videos at once.
+    Copied scenes keep their source encoder's parameter sets, so they
+    only concatenate cleanly if every scene is in the target format and
+    all video streams (SPS/PPS included) are identical. Otherwise every
+    scene is re-encoded with the same libx264 settings.
+    """
+    streams = set()
+    for video_path in video_paths:
+        if not _is_target_video(video_path):
+            return False
+        streams.add(json.dumps(_probe_video_stream(video_path), sort_keys=True))
+    return len(streams) == 1
+
+
+def _mp3_duration(file_path: str) -> float:
+    """Get mp3 duration from its headers (no subprocess)."""
+    return MP3(file_path).info.length
+
+
+def get_audio_durations(paths: list) -> list:
+    """
+    Get durations of TTS mp3 files, reading headers with mutagen.
+    Files mutagen can't handle fall back to a batched ffprobe.
+    """
+    durations = [None] * len(paths)
+    if MP3 is not None:
+        for idx, file_path in enumerate(paths):
+            try:
+                durations[idx] = _mp3_duration(file_path)
+            except Exception:
+                pass
+    
+    missing = [idx for idx, d in enumerate(durations) if d is None]
+    if missing:
+        probed = get_media_durations([paths[idx] for idx in missing])
+        for idx, duration in zip(missing, probed):
+            durations[idx] = duration
+    
+    return durations
+
+
+# Hardware H.264 encoders for the final encode, in order of preference
+HW_ENCODERS = ["h264_nvenc", "h264_qsv", "h264_vaapi"]
+VAAPI_DEVICE = "/dev/dri/renderD128"
+_final_encoder = None
+
+
+def _encoder_args(encoder: str) -> tuple:
+    """
+    FFmpeg arguments for a final-encode H.264 encoder.
+    Returns (global_args, video_filter_suffix, codec_args).
+    """
+    if encoder == "h264_nvenc":
+        return [], "", ["-c:v", "h264_nvenc", "-preset", "p5", "-rc", "vbr", "-cq", "23", "-b:v", "0"]
+    if encoder == "h264_qsv":
+        return [], "", ["-c:v", "h264_qsv", "-preset", "medium", "-global_quality", "23"]
+    if encoder == "h264_vaapi":
+        return ["-vaapi_device", VAAPI_DEVICE], ",format=nv12,hwupload", ["-c:v", "h264_vaapi", "-qp", "23"]
+    return [], "", ["-c:v", "libx264", "-preset", "medium", "-crf", "23"]
+
+
+def get_final_encoder() -> str:
+    """
+    Pick the fastest working H.264 encoder, probed once per run.
+    An encoder listed by ffmpeg may still lack a device/driver, so each
+    candidate is checked with a tiny test encode before it is used.
+    """
+    global _final_encoder
+    if _final_encoder is not None:
+        return _final_encoder
+    
+    _final_encoder = "libx264"
     try:
-        result = subprocess.run([
-            "ffprobe", "-v", "error",
-            "-show_entries", "format=duration",
-            "-of", "default=noprint_wrappers=1:nokey=1",
-            file_path
+        listing = subprocess.run(
+            ["ffmpeg", "-hide_banner", "-encoders"],
+            capture_output=True, text=True
+        ).stdout
+    except OSError:
+        return _final_encoder
+    
+    for encoder in HW_ENCODERS:
+        if encoder not in listing:
+            continue
+        global_args, vf_suffix, codec_args = _encoder_args(encoder)
+        test = subprocess.run([
+            "ffmpeg", "-hide_banner", "-v", "error",
+            *global_args,
+            "-f", "lavfi", "-i", "color=size=256x256:duration=0.1",
+            "-vf", f"format=yuv420p{vf_suffix}",
+            *codec_args,
+            "-f", "null", "-"
         ], capture_output=True, text=True)
-        return float(result.stdout.strip())
-    except:
-        return 5.0  # Default duration
+        if test.returncode == 0:
+            _final_encoder = encoder
+            break
+    
+    print(f"Final encoder: {_final_encoder}")
+    return _final_encoder
+
+
+def _run_ffmpeg_with_progress(cmd: list, total_duration: float) -> subprocess.CompletedProcess:
+    """
+    Run ffmpeg reporting progress from -progress pipe:1 as it encodes.
+    stderr is drained in a thread (to avoid a pipe deadlock) and only
+    its tail is kept for error messages.
+    """
+    cmd = [cmd[0], "-progress", "pipe:1", "-nostats", *cmd[1:]]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            text=True, errors="replace")
+    
+    stderr_tail = deque(maxlen=50)
+    
+    def drain_stderr():
+        try:
+            stderr_tail.extend(proc.stderr)
+        except Exception as e:
+            # Keep the pipe flowing or ffmpeg blocks writing to stderr
+            stderr_tail.append(f"(stderr unreadable: {e})\n")
+            try:
+                while proc.stderr.buffer.read(65536):
+                    pass
+            except Exception:
+                pass
+    
+    drain = threading.Thread(target=drain_stderr, daemon=True)
+    drain.start()
+    
+    last_reported = -10
+    for line in proc.stdout:
+        key, _, value = line.strip().partition("=")
+        if key != "out_time_us" or total_duration <= 0:
+            continue
+        try:
+            percent = min(100, int(int(value) / 1e6 / total_duration * 100))
+        except ValueError:
+            continue  # out_time_us=N/A before the first frame
+        if percent >= last_reported + 10:
+            print(f"  Encoding: {percent}%")
+            last_reported = percent
+    
+    proc.wait()
+    drain.join()
+    return subprocess.CompletedProcess(cmd, proc.returncode, "", "".join(stderr_tail))
+
+
+def _run_final_encode(build_cmd, total_duration: float) -> subprocess.CompletedProcess:
+    """
+    Run the final encode with the selected encoder, retrying with
+    libx264 if a hardware encoder fails.
+    build_cmd(global_args, vf_suffix, codec_args) returns the ffmpeg argv.
+    """
+    encoder = get_final_encoder()
+    result = _run_ffmpeg_with_progress(build_cmd(*_encoder_args(encoder)), total_duration)
+    
+    if result.returncode != 0 and encoder != "libx264":
+        print(f"  {encoder} failed, retrying with libx264...")
+        result = _run_ffmpeg_with_progress(build_cmd(*_encoder_args("libx264")), total_duration)
+    
+    return result
 
 
-def compose_scene(scene_id: int, video_path: str, audio_files: list) -> str:
+def _plan_dialogues(audio_files: list) -> tuple:
+    """
+    Lay out dialogue audio sequentially with small gaps.
+    Returns ([audio_path, ...], end_of_last_dialogue).
+    """
+    audio_paths = [a.get("path", "") for a in audio_files]
+    audio_paths = [p for p in audio_paths if Path(p).exists()]
+    audio_durations = get_audio_durations(audio_paths)
+    
+    current_time = DIALOGUE_LEAD
+    end_time = 0.0
+    
+    for audio_duration in audio_durations:
+        end_time = current_time + min(audio_duration, MAX_DIALOGUE_SECONDS)
+        current_time = end_time + DIALOGUE_GAP
+    
+    return audio_paths, end_time
+
+
+def _dialogue_filter(input_indices: list, out_label: str) -> list:
+    """
+    Build filter_complex parts that join dialogue inputs back to back
+    into [out_label]: a short lead-in silence, then each clip with a
+    silent gap between them. ffmpeg works out clip lengths itself.
+    """
+    def silence(seconds, label):
+        return f"aevalsrc=0:c=stereo:s=48000:d={seconds}[{label}]"
+    
+    filter_parts = [silence(DIALOGUE_LEAD, f"{out_label}_lead")]
+    labels = f"[{out_label}_lead]"
+    
+    for i, input_idx in enumerate(input_indices):
+        if i:
+            filter_parts.append(silence(DIALOGUE_GAP, f"{out_label}_gap{i}"))
+            labels += f"[{out_label}_gap{i}]"
+        filter_parts.append(
+            f"[{input_idx}:a]aformat=sample_rates=48000:channel_layouts=stereo[{out_label}_{i}]"
+        )
+        labels += f"[{out_label}_{i}]"
+    
+    num_segments = 2 * len(input_indices)  # lead + clips + gaps
+    filter_parts.append(f"{labels}concat=n={num_segments}:v=0:a=1[{out_label}]")
+    return filter_parts
+
+
+def _scene_input_length(video_duration: float, dialogue_end: float) -> float:
+    """How much of the scene video to read: capped, but never cutting dialogue."""
+    return max(dialogue_end, min(video_duration, MAX_SCENE_SECONDS))
+
+
+def _dialogue_inputs(audio_paths: list) -> list:
+    """ffmpeg input args for dialogue clips, each capped in length."""
+    inputs = []
+    for audio_path in audio_paths:
+        inputs.extend(["-t", f"{MAX_DIALOGUE_SECONDS:.3f}", "-i", audio_path])
+    return inputs
+
+
+def _compose_silent_scene(video_path: str, output_path: Path, copy_video: bool = False):
+    """Encode a scene with a silent audio track in the normalized format."""
+    scene_len = _scene_input_length(get_media_duration(video_path), 0.0)
+    video_args = ["-c:v", "copy"] if copy_video else ["-vf", SCENE_VIDEO_FILTER, *SCENE_VIDEO_ARGS]
+    subprocess.run([
+        "ffmpeg", "-y",
+        *SCENE_GLOBAL_ARGS,
+        "-ss", "0", "-t", f"{scene_len:.3f}", "-i", video_path,
+        "-f", "lavfi", "-i", "anullsrc=r=48000:cl=stereo",
+        "-map", "0:v",
+        "-map", "1:a",
+        *video_args,
+        *SCENE_AUDIO_ARGS,
+        "-shortest",
+        str(output_path)
+    ], capture_output=True)
+
+
+def compose_scene(scene_id: int, video_path: str, audio_files: list, copy_video: bool = False) -> str:
     """
     Compose a single scene: overlay all dialogue audio onto video.
     Audio files are placed sequentially with small gaps.
+    copy_video keeps the source video stream as-is (see _can_copy_scene_videos).
     """
     output_path = COMPOSED_DIR / f"scene_{scene_id}_composed.mp4"
     
@@ -46,65 +479,44 @@ def compose_scene(scene_id: int, video_path: str, audio_files: list) -> str:
         print(f"  Warning: Video not found: {video_path}")
         return None
     
-    # If no audio, just copy video
-    if not audio_files:
-        subprocess.run([
-            "ffmpeg", "-y", "-i", video_path,
-            "-c:v", "copy", "-an",
-            str(output_path)
-        ], capture_output=True)
+    # Calculate audio placement timing (ffprobe only for the video container)
+    audio_paths, dialogue_end = _plan_dialogues(audio_files)
+    
+    if not audio_paths:
+        # No valid audio files, keep video with a silent track
+        _compose_silent_scene(video_path, output_path, copy_video)
         return str(output_path)
     
-    # Calculate audio placement timing
     video_duration = get_media_duration(video_path)
-    num_dialogues = len(audio_files)
-    gap = 0.3  # Gap between dialogues
-    
-    # Build complex filter for audio mixing
-    filter_parts = []
-    audio_inputs = ["-i", video_path]
-    
-    current_time = 0.2  # Start slightly after beginning
+    scene_len = _scene_input_length(video_duration, dialogue_end)
     
-    for idx, audio_info in enumerate(audio_files):
-        audio_path = audio_info.get("path", "")
-        if not Path(audio_path).exists():
-            continue
-        
-        audio_inputs.extend(["-i", audio_path])
-        audio_idx = idx + 1  # 0 is video
-        
-        # Delay this audio to start at current_time
-        filter_parts.append(f"[{audio_idx}:a]adelay={int(current_time*1000)}|{int(current_time*1000)}[a{idx}]")
-        
-        # Update timing for next dialogue
-        audio_duration = get_media_duration(audio_path)
-        current_time += audio_duration + gap
-    
-    if not filter_parts:
-        # No valid audio files, copy video
-        subprocess.run([
-            "ffmpeg", "-y", "-i", video_path,
-            "-c:v", "copy", "-an",
-            str(output_path)
-        ], capture_output=True)
-        return str(output_path)
+    # Build complex filter for audio mixing (input 0 is video).
+    # -ss/-t before -i stop ffmpeg demuxing past what the scene needs.
+    audio_inputs = ["-ss", "0", "-t", f"{scene_len:.3f}", "-i", video_path]
+    audio_inputs.extend(_dialogue_inputs(audio_paths))
     
-    # Mix all audio tracks
-    audio_labels = "".join([f"[a{i}]" for i in range(len(filter_parts))])
-    filter_parts.append(f"{audio_labels}amix=inputs={len(filter_parts)}:duration=longest[aout]")
+    filter_parts = _dialogue_filter(list(range(1, len(audio_paths) + 1)), "aout")
     
+    if copy_video:
+        # Already normalized H.264 (common for HF Spaces) - only mux audio
+        video_map = "0:v"
+        video_args = ["-c:v", "copy"]
+    else:
+        filter_parts.append(f"[0:v]{SCENE_VIDEO_FILTER}[vout]")
+        video_map = "[vout]"
+        video_args = SCENE_VIDEO_ARGS
     filter_complex = ";".join(filter_parts)
     
     # Run FFmpeg
     cmd = [
         "ffmpeg", "-y",
+        *SCENE_GLOBAL_ARGS,
         *audio_inputs,
         "-filter_complex", filter_complex,
-        "-map", "0:v",
+        "-map", video_map,
         "-map", "[aout]",
-        "-c:v", "libx264", "-preset", "fast",
-        "-c:a", "aac", "-b:a", "128k",
+        *video_args,
+        *SCENE_AUDIO_ARGS,
         "-shortest",
         str(output_path)
     ]
@@ -114,12 +526,186 @@ def compose_scene(scene_id: int, video_path: str, audio_files: list) -> str:
     
     if result.returncode != 0:
         print(f"  FFmpeg error: {result.stderr[:200]}")
-        # Fallback: just copy video without audio
-        subprocess.run([
-            "ffmpeg", "-y", "-i", video_path,
-            "-c:v", "copy", "-an",
+        # Fallback: video with a silent track
+        _compose_silent_scene(video_path, output_path)
+    
+    return str(output_path)
+
+
+def compose_scenes_parallel(scenes: list) -> list:
+    """
+    Compose scenes in parallel - each ffmpeg run is independent.
+    scenes: list of (scene_id, video_path, audio_files).
+    Returns composed paths in scene order (None for failed scenes).
+    """
+    # Each job gets FFMPEG_THREADS cores
+    max_workers = max(1, min(len(scenes), (os.cpu_count() or 2) // FFMPEG_THREADS))
+    composed_videos = [None] * len(scenes)
+    
+    # Copy decision is made for all scenes together so the merge can
+    # stream-copy them; a mixed set is re-encoded consistently instead
+    existing = [v for _, v, _ in scenes if Path(v).exists()]
+    readable = [v for v, info in zip(existing, probe_media(existing)) if info]
+    copy_video = bool(readable) and _can_copy_scene_videos(readable)
+    if copy_video:
+        print("  Scene videos already match the reel format - copying video streams")
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(compose_scene, scene_id, video_path, audio_files, copy_video): idx
+            for idx, (scene_id, video_path, audio_files) in enumerate(scenes)
+        }
+        
+        for future in as_completed(futures):
+            idx = futures[future]
+            try:
+                composed_videos[idx] = future.result()
+            except Exception as e:
+                print(f"  Scene {scenes[idx][0]} failed: {e}")
+    
+    return composed_videos
+
+
+def compose_and_merge(scenes: list) -> str:
+    """
+    Compose and merge all scenes in a single FFmpeg run.
+    Every scene's dialogue mix and 9:16 scaling happen inside one
+    filter graph feeding a concat, so the reel is encoded once instead
+    of once per scene and again at merge time.
+    scenes: list of (scene_id, video_path, audio_files).
+    """
+    output_path = FINAL_DIR / "final_reel.mp4"
+    
+    inputs = []
+    num_inputs = 0
+    filter_parts = []
+    segments = ""
+    num_segments = 0
+    total_duration = 0.0
+    
+    existing = [v for _, v, _ in scenes if Path(v).exists()]
+    video_infos = dict(zip(existing, probe_media(existing)))
+    
+    for scene_id, video_path, audio_files in scenes:
+        if not Path(video_path).exists():
+            print(f"  Warning: Video not found: {video_path}")
+            continue
+        
+        # Empty placeholders from failed generation would abort the graph
+        try:
+            with open(video_path, "rb") as f:
+                is_placeholder = not f.read(1)
+        except OSError:
+            is_placeholder = True
+        if is_placeholder:
+            print(f"  Warning: Unreadable video skipped: {video_path}")
+            continue
+        
+        n = num_segments
+        video_idx = num_inputs
+        # A probe that came back empty is not proof the file is bad; fall
+        # back to the same default get_media_durations uses
+        video_info = video_infos.get(video_path)
+        video_duration = video_info["duration"] if video_info else 5.0
+        audio_paths, dialogue_end = _plan_dialogues(audio_files)
+        
+        input_len = _scene_input_length(video_duration, dialogue_end)
+        inputs.extend(["-ss", "0", "-t", f"{input_len:.3f}", "-i", video_path])
+        inputs.extend(_dialogue_inputs(audio_paths))
+        num_inputs += 1 + len(audio_paths)
+        
+        if audio_paths:
+            # Scene ends with the shorter of video and dialogue (like -shortest)
+            scene_len = min(video_duration, dialogue_end)
+            audio_indices = list(range(video_idx + 1, video_idx + 1 + len(audio_paths)))
+            filter_parts.extend(_dialogue_filter(audio_indices, f"dlg{n}"))
+        else:
+            # Silent track keeps concat segments uniform
+            scene_len = input_len
+            filter_parts.append(f"anullsrc=r=48000:cl=stereo[dlg{n}]")
+        
+        # fps goes after setpts, which would otherwise clear the frame rate
+        filter_parts.append(
+            f"[{video_idx}:v]{SCALE_FILTER},"
+            f"trim=duration={scene_len:.3f},setpts=PTS-STARTPTS,fps=30[vv{n}]"
+        )
+        filter_parts.append(
+            f"[dlg{n}]apad,atrim=duration={scene_len:.3f},asetpts=PTS-STARTPTS[aa{n}]"
+        )
+        segments += f"[vv{n}][aa{n}]"
+        num_segments += 1
+        total_duration += scene_len
+    
+    if not num_segments:
+        print("Error: No valid scene videos to compose")
+        return None
+    
+    filter_parts.append(f"{segments}concat=n={num_segments}:v=1:a=1[vcat][a]")
+    
+    def build_cmd(global_args, vf_suffix, codec_args):
+        return [
+            "ffmpeg", "-y",
+            *global_args,
+            *inputs,
+            "-filter_complex", ";".join(filter_parts + [f"[vcat]null{vf_suffix}[v]"]),
+            "-map", "[v]",
+            "-map", "[a]",
+            "-r", "30",
+            *codec_args,
+            "-threads", "0",  # Final encode runs alone - use all cores
+            "-c:a", "aac", "-b:a", "128k",
+            *FINAL_MOVFLAGS,
             str(output_path)
-        ], capture_output=True)
+        ]
+    
+    print(f"\nComposing and merging {num_segments} scenes in a single pass...")
+    result = _run_final_encode(build_cmd, total_duration)
+    
+    if result.returncode != 0:
+        print(f"Single-pass compose error: {result.stderr[-500:]}")
+        return None
+    
+    # Get final duration
+    duration = get_media_duration(str(output_path))
+    print(f"Final reel created: {output_path}")
+    print(f"Duration: {duration:.1f} seconds")
+    
+    return str(output_path)
+
+
+def _streams_match(videos: list) -> bool:
+    """
+    Check that all videos have identical stream layouts and parameters,
+    including codec parameter sets, so they can be joined without re-encoding.
+    """
+    signatures = set()
+    for info in probe_media(videos):
+        if not info:
+            return False
+        signatures.add(json.dumps(info["streams"], sort_keys=True))
+    return len(signatures) == 1
+
+
+def merge_scenes_fast(videos: list, output_path: Path) -> str:
+    """
+    Concatenate matching scenes with MP4Box, which only rewrites the
+    mp4 boxes - no decode, encode or ffmpeg remux.
+    Returns None if MP4Box is unavailable or fails.
+    """
+    mp4box = shutil.which("MP4Box")
+    if not mp4box:
+        return None
+    
+    # No -force-cat: let MP4Box reject or handle differing codec configs
+    cmd = [mp4box]
+    for video in videos:
+        cmd.extend(["-cat", str(video)])
+    cmd.extend(["-new", str(output_path)])
+    
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        print(f"  MP4Box merge failed: {result.stderr[-200:]}")
+        return None
     
     return str(output_path)
 
@@ -144,23 +730,47 @@ def merge_scenes(composed_videos: list) -> str:
         for video in valid_videos:
             f.write(f"file '{Path(video).absolute()}'\n")
     
-    # Merge with format conversion to 9:16
-    cmd = [
-        "ffmpeg", "-y",
-        "-f", "concat", "-safe", "0",
-        "-i", str(concat_file),
-        "-vf", "scale=1080:1920:force_original_aspect_ratio=decrease,pad=1080:1920:(ow-iw)/2:(oh-ih)/2,setsar=1",
-        "-c:v", "libx264", "-preset", "medium", "-crf", "23",
-        "-c:a", "aac", "-b:a", "128k",
-        "-movflags", "+faststart",
-        str(output_path)
-    ]
-    
     print("\nMerging all scenes into final reel...")
-    result = subprocess.run(cmd, capture_output=True, text=True)
+    
+    # Scenes with identical streams can be joined without re-encoding:
+    # MP4Box first, then ffmpeg's concat demuxer with stream copy
+    result = subprocess.CompletedProcess([], 1, "", "scene streams differ")
+    if _streams_match(valid_videos):
+        if merge_scenes_fast(valid_videos, output_path):
+            result = subprocess.CompletedProcess([], 0, "", "")
+        else:
+            result = subprocess.run([
+                "ffmpeg", "-y",
+                "-f", "concat", "-safe", "0",
+                "-i", str(concat_file),
+                "-c", "copy",
+                *FINAL_MOVFLAGS,
+                str(output_path)
+            ], capture_output=True, text=True)
+    
+    if result.returncode != 0:
+        print(f"  Stream-copy merge not possible, re-encoding: {result.stderr[:200]}")
+        
+        # Merge with format conversion to 9:16
+        def build_cmd(global_args, vf_suffix, codec_args):
+            return [
+                "ffmpeg", "-y",
+                *global_args,
+                "-f", "concat", "-safe", "0",
+                "-i", str(concat_file),
+                "-vf", SCALE_FILTER + vf_suffix,
+                *codec_args,
+                "-threads", "0",  # Final encode runs alone - use all cores
+                "-c:a", "aac", "-b:a", "128k",
+                *FINAL_MOVFLAGS,
+                str(output_path)
+            ]
+        
+        total_duration = sum(get_media_durations(valid_videos))
+        result = _run_final_encode(build_cmd, total_duration)
     
     if result.returncode != 0:
-        print(f"Merge error: {result.stderr[:500]}")
+        print(f"Merge error: {result.stderr[-500:]}")
         return None
     
     # Get final duration
@@ -198,18 +808,21 @@ def main():
     
     print(f"\nFound {len(video_paths)} videos, {len(audio_data)} audio scene sets")
     
-    # Compose each scene
-    composed_videos = []
+    scenes = []
     for idx, video_path in enumerate(video_paths):
         scene_id = idx + 1
         audio_files = audio_by_scene.get(scene_id, [])
         
         print(f"\nScene {scene_id}: {len(audio_files)} audio files")
-        composed = compose_scene(scene_id, video_path, audio_files)
-        composed_videos.append(composed)
+        scenes.append((scene_id, video_path, audio_files))
     
-    # Merge all scenes
-    final_reel = merge_scenes(composed_videos)
+    # Single pass first (one encode); fall back to per-scene compose + merge
+    final_reel = compose_and_merge(scenes)
+    if not final_reel:
+        print("\nFalling back to per-scene compose + merge...")
+        composed_videos = compose_scenes_parallel(scenes)
+        final_reel = merge_scenes(composed_videos)
+    save_duration_cache()
     
     if final_reel:
         # Save final path
@@ -8,7 +8,9 @@ Generates Hindi audio for all dialogues.
 import os
 import sys
 import json
+import shutil
 import asyncio
+import hashlib
 from pathlib import Path
 
 # Edge TTS is the best free option for Hindi
@@ -18,6 +20,10 @@ import edge_tts
 OUTPUT_DIR = Path("outputs/audio")
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
+# Content-addressed cache of generated clips, keyed by voice/rate/pitch/text
+CACHE_DIR = OUTPUT_DIR / ".cache"
+CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
 # Voice mapping for characters
 VOICE_MAP = {
     "maa": "hi-IN-SwaraNeural",      # Female, warm
@@ -38,6 +44,9 @@ VOICE_SETTINGS = {
     "gav_wale": {"rate": "+0%", "pitch": "+0Hz"},
 }
 
+# Max concurrent Edge TTS requests (higher risks Microsoft throttling)
+TTS_CONCURRENCY = 8
+
 
 async def generate_audio(text: str, character: str, output_path: str) -> str:
     """
@@ -49,6 +58,13 @@ async def generate_audio(text: str, character: str, output_path: str) -> str:
     rate = settings.get("rate", "+0%")
     pitch = settings.get("pitch", "+0Hz")
     
+    key = hashlib.blake2b(f"{voice}|{rate}|{pitch}|{text}".encode(), digest_size=16).hexdigest()
+    cached_path = CACHE_DIR / f"{key}.mp3"
+    if cached_path.exists():
+        print(f"  Cached: {character} -> {voice} (rate={rate}, pitch={pitch})")
+        shutil.copy(cached_path, output_path)
+        return output_path
+    
     print(f"  Generating: {character} -> {voice} (rate={rate}, pitch={pitch})")
     
     communicate = edge_tts.Communicate(
@@ -58,10 +74,40 @@ async def generate_audio(text: str, character: str, output_path: str) -> str:
         pitch=pitch
     )
     
-    await communicate.save(output_path)
+    # Collect audio in memory and write it once, so a failed request
+    # never leaves a truncated mp3 behind for the compose step
+    audio = bytearray()
+    async for chunk in communicate.stream():
+        if chunk["type"] == "audio":
+            audio.extend(chunk["data"])
+    
+    if not audio:
+        raise RuntimeError("Edge TTS returned no audio")
+    
+    Path(output_path).write_bytes(audio)
+    
+    # Write the cache entry under a temp name and rename it into place,
+    # so an interrupted run can't leave a truncated clip to be reused
+    tmp_path = CACHE_DIR / f"{key}.{os.getpid()}.{id(audio)}.tmp"
+    tmp_path.write_bytes(audio)
+    os.replace(tmp_path, cached_path)
     return output_path
 
 
+async def _gather_bounded(tasks: list, limit: int = TTS_CONCURRENCY) -> list:
+    """
+    Await coroutines concurrently, at most `limit` at a time.
+    Results (or raised exceptions) are returned in task order.
+    """
+    semaphore = asyncio.Semaphore(limit)
+    
+    async def run(task):
+        async with semaphore:
+            return await task
+    
+    return await asyncio.gather(*(run(t) for t in tasks), return_exceptions=True)
+
+
 async def process_script(script: dict) -> list:
     """
     Process all dialogues in the script and generate audio files.
@@ -69,6 +115,7 @@ async def process_script(script: dict) -> list:
     """
     scenes = script.get("scenes", [])
     all_audio_paths = []
+    jobs = []
     
     for scene in scenes:
         scene_id = scene.get("scene_id", len(all_audio_paths) + 1)
@@ -86,23 +133,30 @@ async def process_script(script: dict) -> list:
             
             output_path = OUTPUT_DIR / f"scene{scene_id}_{character}_{idx+1}.mp3"
             
-            try:
-                await generate_audio(text, character, str(output_path))
-                scene_audio.append({
-                    "path": str(output_path),
-                    "character": character,
-                    "text": text,
-                    "scene_id": scene_id,
-                    "order": idx + 1
-                })
-            except Exception as e:
-                print(f"  Error generating audio: {e}")
+            jobs.append((scene_audio, {
+                "path": str(output_path),
+                "character": character,
+                "text": text,
+                "scene_id": scene_id,
+                "order": idx + 1
+            }))
         
         all_audio_paths.append({
             "scene_id": scene_id,
             "audio_files": scene_audio
         })
     
+    # Dialogues are independent network calls - run them concurrently
+    tasks = [generate_audio(entry["text"], entry["character"], entry["path"]) for _, entry in jobs]
+    results = await _gather_bounded(tasks)
+    
+    # Results come back in job order, so per-scene dialogue order is kept
+    for (scene_audio, entry), result in zip(jobs, results):
+        if isinstance(result, Exception):
+            print(f"  Error generating audio (scene {entry['scene_id']}, line {entry['order']}): {result}")
+            continue
+        scene_audio.append(entry)
+    
     return all_audio_paths
 
 
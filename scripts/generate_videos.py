@@ -9,8 +9,12 @@ import os
 import sys
 import json
 import time
+import shutil
 import requests
+from types import MappingProxyType
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from requests.adapters import HTTPAdapter
 
 # Available HuggingFace Spaces for text-to-video (free)
 VIDEO_SPACES = {
@@ -22,10 +26,49 @@ VIDEO_SPACES = {
 # Default space to use
 DEFAULT_SPACE = "ltx"
 
+# Location descriptions
+_LOCATIONS = MappingProxyType({
+    "village_chowk": "village central square with old banyan tree",
+    "ghar_aangan": "rustic home courtyard with mud walls",
+    "khet": "golden wheat fields at sunset",
+    "handpump_area": "village handpump with women gathering water",
+    "panchayat_ground": "open ground with elders sitting",
+})
+
+# Emotion to visual mapping
+_EMOTIONS = MappingProxyType({
+    "conflict": "tense confrontation, angry gestures",
+    "sadness": "tearful, emotional embrace",
+    "anger_building": "clenched fists, visible frustration",
+    "rage": "explosive anger, dramatic transformation, muscles bulging",
+    "shock": "stunned expressions, stepping back in fear",
+})
+
 # Output directory
 OUTPUT_DIR = Path("outputs/videos")
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
+# Scenes generated concurrently (bounded by the Spaces queue)
+MAX_WORKERS = 4
+
+# Rate-limit / overloaded responses are retried with exponential backoff
+RETRY_STATUS_CODES = (429, 503)
+MAX_RETRIES = 4
+
+# Shared HTTP session so downloads reuse connections across scenes
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=8, pool_maxsize=8))
+_SESSION.mount("http://", HTTPAdapter(pool_connections=8, pool_maxsize=8))
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Inference API session - keep-alive reuses the TLS connection across
+# scenes. Kept separate so the token is never sent to download URLs.
+_HF_SESSION = requests.Session()
+_HF_SESSION.mount("https://", HTTPAdapter(pool_connections=8, pool_maxsize=8))
+if os.environ.get("HF_TOKEN"):
+    _HF_SESSION.headers.update({"Authorization": f"Bearer {os.environ['HF_TOKEN']}"})
+
 
 def build_video_prompt(scene: dict) -> str:
     """
@@ -35,30 +78,12 @@ def build_video_prompt(scene: dict) -> str:
     emotion = scene.get("emotion", "neutral")
     location = scene.get("location", "village_chowk")
     
-    # Location descriptions
-    locations = {
-        "village_chowk": "village central square with old banyan tree",
-        "ghar_aangan": "rustic home courtyard with mud walls",
-        "khet": "golden wheat fields at sunset",
-        "handpump_area": "village handpump with women gathering water",
-        "panchayat_ground": "open ground with elders sitting",
-    }
-    
-    # Emotion to visual mapping
-    emotions = {
-        "conflict": "tense confrontation, angry gestures",
-        "sadness": "tearful, emotional embrace",
-        "anger_building": "clenched fists, visible frustration",
-        "rage": "explosive anger, dramatic transformation, muscles bulging",
-        "shock": "stunned expressions, stepping back in fear",
-    }
-    
     base_prompt = f"""
 Rural Indian village scene.
-{locations.get(location, 'dusty village road')}.
+{_LOCATIONS.get(location, 'dusty village road')}.
 Mud houses, handpump, dusty paths, neem trees in background.
 A tall green-skinned muscular man with rippling muscles and torn farmer clothing.
-{emotions.get(emotion, 'neutral expression')}.
+{_EMOTIONS.get(emotion, 'neutral expression')}.
 Cinematic camera angle, dramatic lighting.
 No text, no watermark, no subtitles.
 Duration: 5-6 seconds.
@@ -91,15 +116,15 @@ def generate_video_gradio(prompt: str, scene_id: int, space_id: str = DEFAULT_SP
         output_path = OUTPUT_DIR / f"scene_{scene_id}.mp4"
         
         if isinstance(result, str) and os.path.exists(result):
-            import shutil
             shutil.copy(result, output_path)
         else:
-            # Result might be a URL
+            # Result might be a URL - stream it straight to disk
             print(f"[Scene {scene_id}] Downloading from URL...")
-            response = requests.get(result, stream=True)
-            with open(output_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
+            with _SESSION.get(result, stream=True) as response:
+                response.raise_for_status()
+                response.raw.decode_content = True
+                with open(output_path, 'wb') as f:
+                    shutil.copyfileobj(response.raw, f, length=DOWNLOAD_CHUNK_SIZE)
         
         print(f"[Scene {scene_id}] Saved to {output_path}")
         return str(output_path)
@@ -114,16 +139,14 @@ def generate_video_api(prompt: str, scene_id: int) -> str:
     Alternative: Direct API call to HuggingFace Inference API.
     Requires HF_TOKEN environment variable.
     """
-    hf_token = os.environ.get("HF_TOKEN")
-    if not hf_token:
+    if not os.environ.get("HF_TOKEN"):
         raise ValueError("HF_TOKEN environment variable required")
     
     api_url = "https://api-inference.huggingface.co/models/ali-vilab/text-to-video-ms-1.7b"
-    headers = {"Authorization": f"Bearer {hf_token}"}
     
     print(f"[Scene {scene_id}] Calling HF Inference API...")
     
-    response = requests.post(api_url, headers=headers, json={"inputs": prompt})
+    response = _HF_SESSION.post(api_url, json={"inputs": prompt})
     
     if response.status_code == 200:
         output_path = OUTPUT_DIR / f"scene_{scene_id}.mp4"
@@ -132,7 +155,52 @@ def generate_video_api(prompt: str, scene_id: int) -> str:
         print(f"[Scene {scene_id}] Saved to {output_path}")
         return str(output_path)
     else:
-        raise Exception(f"API Error: {response.status_code} - {response.text}")
+        raise requests.HTTPError(f"API Error: {response.status_code} - {response.text}", response=response)
+
+
+def _is_rate_limited(error: Exception) -> bool:
+    """Check whether an error is a 429/503 response worth retrying."""
+    response = getattr(error, "response", None)
+    if getattr(response, "status_code", None) in RETRY_STATUS_CODES:
+        return True
+    # gradio_client reports a full Space queue as a plain error message
+    return "Queue is full" in str(error)
+
+
+def _with_backoff(func, *args):
+    """Call func, retrying with exponential backoff when rate limited."""
+    delay = 2
+    for attempt in range(MAX_RETRIES):
+        try:
+            return func(*args)
+        except Exception as e:
+            if attempt == MAX_RETRIES - 1 or not _is_rate_limited(e):
+                raise
+            print(f"Rate limited, retrying in {delay}s: {e}")
+            time.sleep(delay)
+            delay *= 2
+
+
+def generate_scene_video(prompt: str, scene_id: int) -> str:
+    """
+    Generate one scene's video: Gradio first, then the Inference API,
+    then an empty placeholder so later steps still line up.
+    """
+    try:
+        # Try Gradio client first
+        return _with_backoff(generate_video_gradio, prompt, scene_id)
+    except Exception as e:
+        print(f"[Scene {scene_id}] Gradio failed, trying API: {e}")
+    
+    try:
+        return _with_backoff(generate_video_api, prompt, scene_id)
+    except Exception as e2:
+        print(f"[Scene {scene_id}] API also failed: {e2}")
+    
+    # Create placeholder for testing
+    video_path = str(OUTPUT_DIR / f"scene_{scene_id}_placeholder.mp4")
+    Path(video_path).touch()
+    return video_path
 
 
 def main():
@@ -153,32 +221,22 @@ def main():
     
     print(f"Processing {len(scenes)} scenes...")
     
-    video_paths = []
-    for scene in scenes:
-        scene_id = scene.get("scene_id", len(video_paths) + 1)
-        prompt = build_video_prompt(scene)
-        
-        print(f"\n{'='*50}")
-        print(f"Scene {scene_id} Prompt:\n{prompt}")
-        print(f"{'='*50}\n")
-        
-        try:
-            # Try Gradio client first
-            video_path = generate_video_gradio(prompt, scene_id)
-        except Exception as e:
-            print(f"Gradio failed, trying API: {e}")
-            try:
-                video_path = generate_video_api(prompt, scene_id)
-            except Exception as e2:
-                print(f"API also failed: {e2}")
-                # Create placeholder for testing
-                video_path = str(OUTPUT_DIR / f"scene_{scene_id}_placeholder.mp4")
-                Path(video_path).touch()
-        
-        video_paths.append(video_path)
+    video_paths = [None] * len(scenes)
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        futures = {}
+        for idx, scene in enumerate(scenes):
+            scene_id = scene.get("scene_id", idx + 1)
+            prompt = build_video_prompt(scene)
+            
+            print(f"\n{'='*50}")
+            print(f"Scene {scene_id} Prompt:\n{prompt}")
+            print(f"{'='*50}\n")
+            
+            futures[executor.submit(generate_scene_video, prompt, scene_id)] = idx
         
-        # Rate limiting - wait between requests
-        time.sleep(2)
+        # Keep scene order regardless of completion order
+        for future in as_completed(futures):
+            video_paths[futures[future]] = future.result()
     
     # Save paths for next step
     paths_file = Path("outputs/video_paths.json")